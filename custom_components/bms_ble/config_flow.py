@@ -1,7 +1,9 @@
 """Config flow for BLE Battery Management System integration."""
 
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any
+from types import ModuleType
+from typing import Any, Final
 
 import voluptuous as vol
 
@@ -25,6 +27,12 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     MINOR_VERSION = 0
 
+    # BMS plugin modules, shared by all flows once imported
+    _bms_plugins: tuple[ModuleType, ...] = ()
+    # advertisements not supported by any plugin, shared by all flows (FIFO)
+    _unsupported: OrderedDict[tuple, None] = OrderedDict()
+    MAX_UNSUPPORTED: Final = 1024
+
     @dataclass
     class DiscoveredDevice:
         """A discovered bluetooth device."""
@@ -38,15 +46,38 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         self._discovered_device: ConfigFlow.DiscoveredDevice | None = None
         self._discovered_devices: dict[str, ConfigFlow.DiscoveredDevice] = {}
+        self._rejected: set[str] = set()  # addresses of unsupported devices
+
+    async def _async_bms_plugins(self) -> tuple[ModuleType, ...]:
+        """Return all available BMS plugin modules, import them on first use."""
+        if not ConfigFlow._bms_plugins:
+            ConfigFlow._bms_plugins = tuple(
+                [
+                    await async_import_module(
+                        self.hass, f"custom_components.bms_ble.plugins.{bms_type}"
+                    )
+                    for bms_type in BMS_TYPES
+                ]
+            )
+        return ConfigFlow._bms_plugins
 
     async def _async_device_supported(
         self, discovery_info: BluetoothServiceInfoBleak
     ) -> str | None:
         """Check if device is supported by an available BMS class."""
-        for bms_type in BMS_TYPES:
-            bms_plugin = await async_import_module(
-                self.hass, f"custom_components.bms_ble.plugins.{bms_type}"
-            )
+        # all advertisement properties used by the BMS matchers
+        adv_key = (
+            discovery_info.address,
+            discovery_info.name,
+            frozenset(discovery_info.service_uuids),
+            frozenset(discovery_info.manufacturer_data),
+            discovery_info.connectable,
+        )
+        if adv_key in ConfigFlow._unsupported:
+            return None
+
+        plugin_error = False
+        for bms_plugin in await self._async_bms_plugins():
             try:
                 if bms_plugin.BMS.supported(discovery_info):
                     LOGGER.debug(
@@ -57,7 +88,13 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     )
                     return bms_plugin.__name__
             except AttributeError:
-                LOGGER.error("Invalid BMS plugin %s", bms_type)
+                LOGGER.error("Invalid BMS plugin %s", bms_plugin.__name__)
+                plugin_error = True
+
+        if not plugin_error:
+            ConfigFlow._unsupported[adv_key] = None
+            if len(ConfigFlow._unsupported) > self.MAX_UNSUPPORTED:
+                ConfigFlow._unsupported.popitem(last=False)
         return None
 
     async def async_step_bluetooth(
@@ -121,10 +158,15 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         current_addresses = self._async_current_ids()
         for discovery_info in async_discovered_service_info(self.hass, False):
             address = discovery_info.address
-            if address in current_addresses or address in self._discovered_devices:
+            if (
+                address in current_addresses
+                or address in self._discovered_devices
+                or address in self._rejected
+            ):
                 continue
             device_class = await self._async_device_supported(discovery_info)
             if not device_class:
+                self._rejected.add(address)
                 continue
 
             self._discovered_devices[address] = ConfigFlow.DiscoveredDevice(
@@ -134,9 +176,10 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if not self._discovered_devices:
             return self.async_abort(reason="no_devices_found")
 
-        titles = []
-        for address, discovery in self._discovered_devices.items():
-            titles.append({"value": address, "label": f"{discovery.name} ({address})"})
+        titles = [
+            {"value": address, "label": f"{discovery.name} ({address})"}
+            for address, discovery in self._discovered_devices.items()
+        ]
 
         return self.async_show_form(
             step_id="user",
@@ -1,9 +1,9 @@
 """Module to support Supervolt BMS (Black Battery)."""
 
-import sys
 import asyncio
 from collections.abc import Callable
 import logging
+import struct
 from typing import Any, Final
 import time
 
@@ -35,233 +35,224 @@ MAX_TIME_S: Final = 120
 
 LOGGER = logging.getLogger(__name__)
 
-UUID_TX: Final = normalize_uuid_str("ff02")
+UUID_RX: Final = normalize_uuid_str("6e400003-b5a3-f393-e0a9-e50e24dcca9e")
+UUID_TX: Final = normalize_uuid_str("6e400002-b5a3-f393-e0a9-e50e24dcca9e")
 UUID_SERVICE: Final = normalize_uuid_str("ff00")
 
+# frames are sent as ASCII hex between ':' and '~', layouts refer to the decoded bytes,
+# the hex slices select the part of a frame to decode for the layout
+# realtime data: address, command, version, length, date, 16 cell voltages [mV],
+# charge current [10mA], discharge current [10mA], 4 temperatures [°C + 40],
+# working state, alarm, balance state, discharge count, charge count, SoC [%]
+REALTIME_FRAME: Final = struct.Struct(">BBBH7s32sHH4sHBHHHB")
+REALTIME_LEN: Final = 128
+REALTIME_HEX: Final = slice(1, 1 + 2 * REALTIME_FRAME.size)
+# capacity: address, command, version, length, reserved,
+# remaining capacity, complete capacity, designed capacity [100mAh]
+CAPACITY_FRAME: Final = struct.Struct(">BBBH2xHHH")
+CAPACITY_LEN: Final = 30
+CAPACITY_HEX: Final = slice(1, 1 + 2 * CAPACITY_FRAME.size)
+# voltages of the used cells [mV] within the cell voltage block
+CELL_VOLTAGES: Final = struct.Struct(">11H")
+# keys of the reported cell voltages
+CELL_KEYS: Final = tuple(f"{KEY_CELL_VOLTAGE}{i+1}" for i in range(4))
+
+# working state bits and their description
+WORKING_STATE_TEXT: Final = (
+    (0x0001, "Laden"),
+    (0x0002, "Entladen"),
+    (0x0004, "Überladungsschutz"),
+    (0x0008, "Entladeschutz"),
+    (0x0010, "Überladen"),
+    (0x0020, "Kurzschluss"),
+    (0x0040, "Entladeschutz 1"),
+    (0x0080, "Entladeschutz 2"),
+    (0x0100, "Überhitzt (Laden)"),
+    (0x0200, "Unterkühlt (Laden)"),
+    (0x0400, "Überhitzt (Entladen)"),
+    (0x0800, "Unterkühlt (Entladen)"),
+    (0x1000, "DFET an"),
+    (0x2000, "CFET an"),
+    (0x4000, "DFET Schalter an"),
+    (0x8000, "CFET Schalter an"),
+)
+# summarized states in order of priority, as (mask, minimum masked value, text)
+WORKING_STATE_TEXT_SHORT: Final = (
+    (0xF003, 0xF000, "Normal"),
+    (0x000C, 0x0001, "Schutzschaltung"),
+    (0x0020, 0x0001, "Kurzschluss"),
+    (0x0500, 0x0001, "Überhitzt"),
+    (0x0A00, 0x0001, "Unterkühlt"),
+)
+
 class SupervoltData:
-    cellV = None
-    totalV = None
-    soc = None
-    workingState = None
-    alarm = None
-    chargingA = None
-    dischargingA = None
-    loadA = None
-    tempC = None
-    completeAh = None
-    remainingAh = None
-    designedAh = None
-    verbose = False
-
-
-    # time of data changed
-    lastUpdatetime = time.time()
+    __slots__ = (
+        "cellV",
+        "totalV",
+        "soc",
+        "workingState",
+        "alarm",
+        "chargingA",
+        "dischargingA",
+        "loadA",
+        "tempC",
+        "completeAh",
+        "remainingAh",
+        "designedAh",
+        "lastUpdatetime",
+        "address",
+        "command",
+        "version",
+        "length",
+        "balanceState",
+        "dischargeNumber",
+        "chargeNumber",
+    )
 
     def __init__(self) -> None:
-        self.tempC = [None, None, None, None]
-        self.cellV = [None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None]
+        self.cellV: list[float | None] = [None] * 16
+        self.totalV: float | None = None
+        self.soc: int | None = None
+        self.workingState: int | None = None
+        self.alarm: int | None = None
+        self.chargingA: float | None = None
+        self.dischargingA: float | None = None
+        self.loadA: float | None = None
+        self.tempC: list[int | None] = [None] * 4
+        self.completeAh: float | None = None
+        self.remainingAh: float | None = None
+        self.designedAh: float | None = None
+        # time of data changed (monotonic clock)
+        self.lastUpdatetime: float = time.monotonic()
+        self.address: int | None = None
+        self.command: int | None = None
+        self.version: int | None = None
+        self.length: int | None = None
+        self.balanceState: int | None = None
+        self.dischargeNumber: int | None = None
+        self.chargeNumber: int | None = None
 
-    def parse(self, data: bytearray):
+    @staticmethod
+    def _decode(
+        data: bytes | bytearray, layout: struct.Struct, hex_slice: slice
+    ) -> tuple[Any, ...] | None:
+        """Decode the ASCII hex payload of a frame into its fields."""
         try:
-            if data:
-                if self.verbose:
-                    LOGGER.debug("parse data: {}".format(type(data)))
-                if len(data) == 128:
-                    if self.verbose:
-                        LOGGER.debug("parse Realtimedata: {}".format(type(data)))
-                    if type(data) is bytearray: 
-                        data = bytes(data)
-                    if type(data) is bytes:
-                        # print("bytes")
-                    
-                        start = 1
-                        end = start + 2
-                        self.address = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("address: " + str(self.address))
-                        
-                        start = end
-                        end = start + 2
-                        self.command = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("command: " + str(self.command))
-                        
-                        start = end
-                        end = start + 2
-                        self.version = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("version: " + str(self.version))
-                        
-                        start = end
-                        end = start + 4
-                        self.length = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("length: " + str(self.length))
-                        
-                        start = end
-                        end = start + 14
-                        bdate = data[start: end]
-                        if self.verbose:
-                            LOGGER.debug("date: " + str(bdate))
-                    
-                        start = end
-                        end = start + 16 * 4
-                        bvoltarray = data[start: end]
-                        # print("voltarray: " + str(bvoltarray))
-                        self.totalV = 0
-                        if self.cellV:
-                            for i in range(0, 11):
-                                bvolt = data[(start + i * 4): (start + i * 4 + 4)]
-                                self.cellV[i] = int(bvolt.decode(), 16) / 1000.0
-                                self.totalV += self.cellV[i]
-                                if self.verbose:
-                                    LOGGER.debug("volt" + str(i) + ": " + str(bvolt) + " / " + str(self.cellV[i]) + "V")
-                        
-                        if self.verbose:
-                            LOGGER.debug("totalVolt: " + str(self.totalV))
-                        
-                        start = end
-                        end = start + 4
-                        bcharging = data[start: end]
-                        self.chargingA = int(bcharging.decode(), 16) / 100.0
-                        if self.verbose:
-                            LOGGER.debug("charching: " + str(bcharging) + " / " + str(self.chargingA) + "A")
-                        if self.chargingA > 500:
-                            # problem with supervolt
-                            LOGGER.info("charging too big: {}".format(self.chargingA))
-                            self.chargingA = 0.0
-                            
-                        start = end
-                        end = start + 4
-                        bdischarging = data[start: end]
-                        self.dischargingA = int(bdischarging.decode(), 16) / 100.0
-                        if self.verbose:
-                            LOGGER.debug("discharching: " + str(bdischarging) + " / " + str(self.dischargingA) + "A")
-                        if self.dischargingA > 500:
-                            # problem with supervolt
-                            LOGGER.info("discharging too big: {}".format(self.dischargingA))
-                            self.dischargingA = 0.0
-                        
-                        self.loadA = -self.chargingA + self.dischargingA
-                        
-                        for i in range(0, 4):
-                            start = end
-                            end = start + 2
-                            if self.tempC:
-                                btemp = data[start: end]
-                                self.tempC[i] = int(btemp.decode(), 16) - 40
-                                if self.verbose:
-                                    LOGGER.debug("temp" + str(i) + ": " + str(btemp) + " / " + str(self.tempC[i]) + "°C")
-                        
-                        start = end
-                        end = start + 4
-                        self.workingState = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("workingstate: " + str(self.workingState) + " / " + str(data[start: end])
-                            +" / " + self.getWorkingStateTextShort() + " / " + self.getWorkingStateText())
-                        
-                        start = end
-                        end = start + 2
-                        self.alarm = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("alarm: " + str(self.alarm))
-                        
-                        start = end
-                        end = start + 4
-                        self.balanceState = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("balanceState: " + str(self.balanceState))
-                        
-                        start = end
-                        end = start + 4
-                        self.dischargeNumber = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("dischargeNumber: " + str(self.dischargeNumber))
-                            
-                        start = end
-                        end = start + 4
-                        self.chargeNumber = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("chargeNumber: " + str(self.chargeNumber))
-                        
-                        # State of Charge (%)
-                        start = end
-                        end = start + 2
-                        self.soc = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("soc: " + str(self.soc))
-                            LOGGER.info("end of parse realtimedata")
-                        self.lastUpdatetime = time.time()
-                    else:
-                        LOGGER.warning("no bytes")
-                elif len(data) == 30:
-                    if self.verbose:
-                        LOGGER.debug("capacity")
-                    if type(data) is bytearray: 
-                        data = bytes(data)
-                    if type(data) is bytes:
-                        start = 1
-                        end = start + 2
-                        self.address = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("address: " + str(self.address))
-                        
-                        start = end
-                        end = start + 2
-                        self.command = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("command: " + str(self.command))
-                        
-                        start = end
-                        end = start + 2
-                        self.version = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("version: " + str(self.version))
-                        
-                        start = end
-                        end = start + 4
-                        self.length = int(data[start: end].decode(), 16)
-                        if self.verbose:
-                            LOGGER.debug("length: " + str(self.length))
-                        
-                        start = end
-                        end = start + 4
-                        breseved = data[start: end]
-                        if self.verbose:
-                            LOGGER.debug("reseved: " + str(breseved))
-                        
-                        start = end
-                        end = start + 4
-                        self.remainingAh = int(data[start: end].decode(), 16) / 10.0
-                        if self.verbose:
-                            LOGGER.debug("remainingAh: " + str(self.remainingAh) + " / " + str(data[start: end]))
-                        
-                        start = end
-                        end = start + 4
-                        self.completeAh = int(data[start: end].decode(), 16) / 10.0
-                        if self.verbose:
-                            LOGGER.debug("completeAh: " + str(self.completeAh))
-                        
-                        start = end
-                        end = start + 4
-                        self.designedAh = int(data[start: end].decode(), 16) / 10.0
-                        if self.verbose:
-                            LOGGER.debug("designedAh: " + str(self.designedAh))
-                            LOGGER.info("end of parse capacity")
-                        self.lastUpdatetime = time.time()
-                        
-                else:
-                    LOGGER.warning("wrong length: " + str(len(data)))
-            else:
-                LOGGER.debug("no data")
-        except:
-            LOGGER.error(sys.exc_info(), exc_info=True)
+            return layout.unpack_from(bytes.fromhex(data[hex_slice].decode("ascii")))
+        except (ValueError, struct.error):
+            LOGGER.warning("invalid frame: %s", data)
+            return None
+
+    def parse(self, data: bytes | bytearray, timestamp: float):
+        if not data:
+            LOGGER.debug("no data")
+            return
+
+        data_len = len(data)
+        if data_len == REALTIME_LEN:
+            if (fields := self._decode(data, REALTIME_FRAME, REALTIME_HEX)) is None:
+                return
+            (
+                self.address,
+                self.command,
+                self.version,
+                self.length,
+                bdate,
+                bcells,
+                charging,
+                discharging,
+                btemps,
+                self.workingState,
+                self.alarm,
+                self.balanceState,
+                self.dischargeNumber,
+                self.chargeNumber,
+                self.soc,  # State of Charge (%)
+            ) = fields
+
+            cells = CELL_VOLTAGES.unpack_from(bcells)
+            self.cellV[:11] = [cell / 1000.0 for cell in cells]
+            self.totalV = sum(cells) / 1000.0
+
+            self.chargingA = charging / 100.0
+            if self.chargingA > 500:
+                # problem with supervolt
+                LOGGER.info("charging too big: %s", self.chargingA)
+                self.chargingA = 0.0
+
+            self.dischargingA = discharging / 100.0
+            if self.dischargingA > 500:
+                # problem with supervolt
+                LOGGER.info("discharging too big: %s", self.dischargingA)
+                self.dischargingA = 0.0
+
+            self.loadA = -self.chargingA + self.dischargingA
+
+            self.tempC[:] = [temp - 40 for temp in btemps]
+
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.debug(
+                    "realtime data: address: %i, command: %i, version: %i, "
+                    "length: %i, date: %s, cells: %s (%sV), charging: %sA, "
+                    "discharging: %sA, temperatures: %s°C, workingstate: %s "
+                    "(%s / %s), alarm: %i, balanceState: %i, "
+                    "dischargeNumber: %i, chargeNumber: %i, soc: %i",
+                    self.address,
+                    self.command,
+                    self.version,
+                    self.length,
+                    bdate.hex(),
+                    self.cellV[:11],
+                    self.totalV,
+                    self.chargingA,
+                    self.dischargingA,
+                    self.tempC,
+                    self.workingState,
+                    self.getWorkingStateTextShort(),
+                    self.getWorkingStateText(),
+                    self.alarm,
+                    self.balanceState,
+                    self.dischargeNumber,
+                    self.chargeNumber,
+                    self.soc,
+                )
+            self.lastUpdatetime = timestamp
+        elif data_len == CAPACITY_LEN:
+            if (fields := self._decode(data, CAPACITY_FRAME, CAPACITY_HEX)) is None:
+                return
+            (
+                self.address,
+                self.command,
+                self.version,
+                self.length,
+                remaining,
+                complete,
+                designed,
+            ) = fields
+            self.remainingAh = remaining / 10.0
+            self.completeAh = complete / 10.0
+            self.designedAh = designed / 10.0
+            LOGGER.debug(
+                "capacity data: address: %i, command: %i, version: %i, "
+                "length: %i, remainingAh: %s, completeAh: %s, designedAh: %s",
+                self.address,
+                self.command,
+                self.version,
+                self.length,
+                self.remainingAh,
+                self.completeAh,
+                self.designedAh,
+            )
+            self.lastUpdatetime = timestamp
+        else:
+            LOGGER.warning("wrong length: %i", data_len)
 
     def getData(self):
-        if (time.time() - self.lastUpdatetime) > MAX_TIME_S or not self.totalV:
+        if not self.totalV or (time.monotonic() - self.lastUpdatetime) > MAX_TIME_S:
             # data is old
             LOGGER.debug("data too old")
             return None
+        cells = self.cellV[:4]
         data = {
             ATTR_VOLTAGE: self.totalV,
             ATTR_DELTA_VOLTAGE: self.totalV,
@@ -269,19 +260,11 @@ class SupervoltData:
             ATTR_BATTERY_LEVEL: self.soc,
             #ATTR_POWER: (self.totalV * self.loadA),
             ATTR_CYCLE_CAP: self.remainingAh,
-            KEY_CELL_COUNT: 4
+            ATTR_TEMPERATURE: self.tempC[0],
+            KEY_CELL_COUNT: 4,
+            **dict(zip(CELL_KEYS, cells)),
+            ATTR_CELL_VOLTAGES: cells,
         }  # set fixed values for dummy battery
-        if self.tempC:
-            data |= {
-                ATTR_TEMPERATURE: self.tempC[0]
-            }
-        for i in range(0,4):
-            data |= {f"{KEY_CELL_VOLTAGE}{i+1}": self.cellV[i]}
-        data |= {ATTR_CELL_VOLTAGES: [
-                    v
-                    for k, v in data.items()
-                    if k.startswith(KEY_CELL_VOLTAGE)
-                ]}
 
         return data
 
@@ -290,9 +273,7 @@ class SupervoltData:
             LOGGER.info("reset")
             self.alarm = None
             self.balanceState = None
-            if self.cellV:
-                for i in range(0, 11):
-                    self.cellV[i] = None
+            self.cellV[:11] = [None] * 11
             self.chargeNumber = None
             self.chargingA = None
             self.completeAh = None
@@ -302,78 +283,37 @@ class SupervoltData:
             self.loadA = None
             self.remainingAh = None
             self.soc = None
-            if self.tempC:
-                for i in range(0, 4):
-                    self.tempC[i] = None
+            self.tempC[:] = [None] * 4
             self.totalV = None
             self.version = None
             self.workingState = None
-        except:
-            LOGGER.error(sys.exc_info(), exc_info=True)
+        except Exception:
+            LOGGER.exception("supervolt reset failed")
 
     def getWorkingStateTextShort(self):
         if self.workingState is None:
             return "nicht erreichbar"
-        if self.workingState & 0xF003 >= 0xF000:
-            return "Normal"
-        if self.workingState & 0x000C > 0x0000:
-            return "Schutzschaltung"
-        if self.workingState & 0x0020 > 0:
-            return "Kurzschluss"
-        if self.workingState & 0x0500 > 0:
-            return "Überhitzt"
-        if self.workingState & 0x0A00 > 0:
-            return "Unterkühlt"
-        return "Unbekannt"
+        return next(
+            (
+                text
+                for mask, minimum, text in WORKING_STATE_TEXT_SHORT
+                if self.workingState & mask >= minimum
+            ),
+            "Unbekannt",
+        )
 
     def getWorkingStateText(self):
-        text = ""
         if self.workingState is None:
             return "Unbekannt"
-        if self.workingState & 0x0001 > 0:
-            text = self.appendState(text, "Laden")
-        if self.workingState & 0x0002 > 0:
-            text = self.appendState(text , "Entladen")
-        if self.workingState & 0x0004 > 0:
-            text = self.appendState(text , "Überladungsschutz")
-        if self.workingState & 0x0008 > 0:
-            text = self.appendState(text , "Entladeschutz")
-        if self.workingState & 0x0010 > 0:
-            text = self.appendState(text , "Überladen")
-        if self.workingState & 0x0020 > 0:
-            text = self.appendState(text , "Kurzschluss")
-        if self.workingState & 0x0040 > 0:
-            text = self.appendState(text , "Entladeschutz 1")
-        if self.workingState & 0x0080 > 0:
-            text = self.appendState(text , "Entladeschutz 2")
-        if self.workingState & 0x0100 > 0:
-            text = self.appendState(text , "Überhitzt (Laden)")
-        if self.workingState & 0x0200 > 0:
-            text = self.appendState(text , "Unterkühlt (Laden)")
-        if self.workingState & 0x0400 > 0:
-            text = self.appendState(text , "Überhitzt (Entladen)")
-        if self.workingState & 0x0800 > 0:
-            text = self.appendState(text , "Unterkühlt (Entladen)")
-        if self.workingState & 0x1000 > 0:
-            text = self.appendState(text , "DFET an")
-        if self.workingState & 0x2000 > 0:
-            text = self.appendState(text , "CFET an")
-        if self.workingState & 0x4000 > 0:
-            text = self.appendState(text , "DFET Schalter an")
-        if self.workingState & 0x8000 > 0:
-            text = self.appendState(text , "CFET Schalter an")
-        
-        return text
-
-    def appendState(self, text, append):
-        if text is None  or len(text) == 0:
-            return append
-        return text + " | " + append
+        return " | ".join(
+            text for mask, text in WORKING_STATE_TEXT if self.workingState & mask
+        )
 
 class BMS(BaseBMS):
     """Supervolt battery class implementation."""
-    supervoltDatas = {}
-    supervoltData: SupervoltData = None
+
+    CMD_REALTIME: Final = b":000250000E03~"
+    CMD_CAPACITY: Final = b":001031000E05~"
 
     def __init__(self, ble_device: BLEDevice, reconnect: bool = False) -> None:
         """Initialize BMS."""
@@ -383,8 +323,8 @@ class BMS(BaseBMS):
         assert self._ble_device.name is not None
         self._client: BleakClient | None = None
         self._data_event = asyncio.Event()
-        # store old data, cause connection sometime fails
-        self.supervoltData = self.supervoltDatas.get(self._ble_device.name , SupervoltData())
+        self._frames_needed: int = 0  # number of responses still to be received
+        self.supervoltData = SupervoltData()
 
     @staticmethod
     def matcher_dict_list() -> list[dict[str, Any]]:
@@ -407,7 +347,7 @@ class BMS(BaseBMS):
                 services=[UUID_SERVICE],
             )
             await self._client.connect()
-            await self._client.start_notify("6e400003-b5a3-f393-e0a9-e50e24dcca9e", self._notification_handler)
+            await self._client.start_notify(UUID_RX, self._notification_handler)
             LOGGER.debug("notify started")
         else:
             LOGGER.debug("BMS %s already connected", self._ble_device.name)
@@ -419,13 +359,11 @@ class BMS(BaseBMS):
             len(data),
             data
         )
-        self.supervoltData.parse(data)
-
-        self._data_event.set()
+        self.supervoltData.parse(data, time.monotonic())
 
-    async def _wait_event(self) -> None:
-        await self._data_event.wait()
-        self._data_event.clear()
+        self._frames_needed -= 1
+        if self._frames_needed <= 0:
+            self._data_event.set()
 
     async def disconnect(self) -> None:
         """Disconnect connection to BMS if active."""
@@ -434,7 +372,7 @@ class BMS(BaseBMS):
             try:
                 self._data_event.clear()
                 # stop notify
-                await self._client.stop_notify("6e400003-b5a3-f393-e0a9-e50e24dcca9e")
+                await self._client.stop_notify(UUID_RX)
                 await self._client.disconnect()
             except BleakError:
                 LOGGER.warning("Disconnect failed!")
@@ -451,18 +389,18 @@ class BMS(BaseBMS):
                 # connection established
                 self.supervoltData.resetValues()
 
-                data = bytes(":000250000E03~", "ascii")
-                handle = "6e400002-b5a3-f393-e0a9-e50e24dcca9e"
-                await self._client.write_gatt_char(char_specifier=handle, data=data)
-                await asyncio.wait_for(self._wait_event(), timeout=BAT_TIMEOUT)
-
-                data = bytes(":001031000E05~", "ascii")
-                handle = "6e400002-b5a3-f393-e0a9-e50e24dcca9e"
-                await self._client.write_gatt_char(char_specifier=handle, data=data)
-                await asyncio.wait_for(self._wait_event(), timeout=BAT_TIMEOUT)
-                await self.disconnect()
-        except:
-            LOGGER.error(sys.exc_info(), exc_info=True)    
+                # send both requests at once and wait for both responses
+                self._frames_needed = 2
+                self._data_event.clear()
+                await self._client.write_gatt_char(UUID_TX, data=self.CMD_REALTIME)
+                await self._client.write_gatt_char(UUID_TX, data=self.CMD_CAPACITY)
+                await asyncio.wait_for(self._data_event.wait(), timeout=BAT_TIMEOUT)
+
+                if self._reconnect:
+                    # disconnect after data update to force reconnect next time (slow!)
+                    await self.disconnect()
+        except Exception:
+            LOGGER.exception("supervolt update failed")
 
         data = self.supervoltData.getData()
         assert data is not None
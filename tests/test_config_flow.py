@@ -1,5 +1,8 @@
 """Test the BLE Battery Management System integration config flow."""
 
+from collections import OrderedDict
+
+from custom_components.bms_ble.config_flow import ConfigFlow
 from custom_components.bms_ble.const import DOMAIN
 from custom_components.bms_ble.plugins.basebms import BaseBMS
 from pytest_homeassistant_custom_component.common import MockConfigEntry
@@ -73,6 +76,36 @@ async def test_device_not_supported(
     assert result.get("reason") == "not_supported"
 
 
+async def test_device_not_supported_cached(
+    monkeypatch, BTdiscovery_notsupported, hass: HomeAssistant
+) -> None:
+    """Test that unsupported devices are remembered across flows."""
+
+    monkeypatch.setattr(ConfigFlow, "_unsupported", OrderedDict())
+
+    for _ in range(2):
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN,
+            context={"source": SOURCE_BLUETOOTH},
+            data=BTdiscovery_notsupported,
+        )
+
+        assert result.get("type") == FlowResultType.ABORT
+        assert result.get("reason") == "not_supported"
+        assert len(ConfigFlow._unsupported) == 1  # noqa: SLF001
+
+    # check that oldest entries are dropped when cache is full
+    monkeypatch.setattr(ConfigFlow, "_unsupported", OrderedDict())
+    monkeypatch.setattr(ConfigFlow, "MAX_UNSUPPORTED", 0)
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": SOURCE_BLUETOOTH},
+        data=BTdiscovery_notsupported,
+    )
+    assert result.get("reason") == "not_supported"
+    assert not ConfigFlow._unsupported  # noqa: SLF001
+
+
 async def test_invalid_plugin(monkeypatch, BTdiscovery, hass: HomeAssistant) -> None:
     """Test discovery via bluetooth with a valid device but invalid plugin.
 
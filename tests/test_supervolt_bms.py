@@ -0,0 +1,189 @@
+"""Test the Supervolt BMS implementation."""
+
+from collections.abc import Buffer
+import time
+from uuid import UUID
+
+from bleak.backends.characteristic import BleakGATTCharacteristic
+from bleak.uuids import normalize_uuid_str
+from custom_components.bms_ble.plugins.supervolt_bms import (
+    BMS,
+    MAX_TIME_S,
+    SupervoltData,
+)
+
+from .bluetooth import generate_ble_device
+from .conftest import MockBleakClient
+
+RESP_REALTIME = bytearray(
+    b":0103000074000000000000000CB20DAC0BB80C3500000000000000000000000000000"
+    b"0000000000000000000000000C841424344F000000000000A000B5000~"
+)  # cells: 3.25, 3.5, 3.0, 3.125V, discharging: 2.0A, temp: 25°C, soc: 80%
+RESP_CAPACITY = bytearray(
+    b":01030000080000006400C800C800~"
+)  # remaining: 10.0Ah, complete: 20.0Ah, designed: 20.0Ah
+
+
+class MockSupervoltBleakClient(MockBleakClient):
+    """Emulate a Supervolt BMS BleakClient."""
+
+    def _response(
+        self, char_specifier: BleakGATTCharacteristic | int | str | UUID, data: Buffer
+    ) -> bytearray:
+        if char_specifier == normalize_uuid_str("6e400002-b5a3-f393-e0a9-e50e24dcca9e"):
+            if bytearray(data) == bytearray(b":000250000E03~"):
+                return RESP_REALTIME
+            if bytearray(data) == bytearray(b":001031000E05~"):
+                return RESP_CAPACITY
+
+        return bytearray()
+
+    async def write_gatt_char(
+        self,
+        char_specifier: BleakGATTCharacteristic | int | str | UUID,
+        data: Buffer,
+        response: bool = None,  # type: ignore[implicit-optional] # same as upstream
+    ) -> None:
+        """Issue write command to GATT."""
+
+        assert (
+            self._notify_callback
+        ), "write to characteristics but notification not enabled"
+
+        if resp := self._response(char_specifier, data):
+            self._notify_callback("MockSupervoltBleakClient", resp)
+
+    async def stop_notify(
+        self, char_specifier: BleakGATTCharacteristic | int | str | UUID
+    ) -> None:
+        """Mock stop_notify."""
+        assert self._connected, "stop_notify called, but client not connected."
+
+
+class MockMissingCapacityBleakClient(MockSupervoltBleakClient):
+    """Emulate a Supervolt BMS BleakClient not answering the capacity request."""
+
+    def _response(
+        self, char_specifier: BleakGATTCharacteristic | int | str | UUID, data: Buffer
+    ) -> bytearray:
+        if bytearray(data) == bytearray(b":000250000E03~"):
+            return RESP_REALTIME
+
+        return bytearray()
+
+
+async def test_update(monkeypatch, reconnect_fixture) -> None:
+    """Test Supervolt BMS data update."""
+
+    monkeypatch.setattr(
+        "custom_components.bms_ble.plugins.supervolt_bms.BleakClient",
+        MockSupervoltBleakClient,
+    )
+
+    bms = BMS(
+        generate_ble_device("cc:cc:cc:cc:cc:cc", "MockBLEdevice", None, -73),
+        reconnect_fixture,
+    )
+
+    result = await bms.async_update()
+
+    assert result == {
+        "voltage": 12.875,
+        "delta_voltage": 12.875,
+        "current": 2.0,
+        "battery_level": 80,
+        "cycle_capacity": 10.0,
+        "cell_count": 4,
+        "temperature": 25,
+        "cell#1": 3.25,
+        "cell#2": 3.5,
+        "cell#3": 3.0,
+        "cell#4": 3.125,
+        "cell_voltages": [3.25, 3.5, 3.0, 3.125],
+        "power": 25.75,
+        "battery_charging": True,
+    }
+
+    # query again to check already connected state
+    result = await bms.async_update()
+    assert bms._client and bms._client.is_connected is not reconnect_fixture  # noqa: SLF001
+
+    await bms.disconnect()
+
+
+async def test_missing_response(monkeypatch) -> None:
+    """Test data update with BMS not sending the capacity response."""
+
+    monkeypatch.setattr(
+        "custom_components.bms_ble.plugins.supervolt_bms.BAT_TIMEOUT", 0.1
+    )
+    monkeypatch.setattr(
+        "custom_components.bms_ble.plugins.supervolt_bms.BleakClient",
+        MockMissingCapacityBleakClient,
+    )
+
+    bms = BMS(generate_ble_device("cc:cc:cc:cc:cc:cc", "MockBLEdevice", None, -73))
+
+    result = await bms.async_update()
+
+    assert result["voltage"] == 12.875
+    assert result["cycle_capacity"] is None
+
+    await bms.disconnect()
+
+
+def test_parse() -> None:
+    """Test decoding of realtime and capacity frames."""
+
+    data = SupervoltData()
+    data.parse(RESP_REALTIME, time.monotonic())
+    data.parse(bytes(RESP_CAPACITY), time.monotonic())
+
+    assert data.cellV[:11] == [3.25, 3.5, 3.0, 3.125] + [0.0] * 7
+    assert data.tempC == [25, 26, 27, 28]
+    assert (data.soc, data.workingState, data.dischargeNumber, data.chargeNumber) == (
+        80,
+        0xF000,
+        10,
+        11,
+    )
+    assert (data.remainingAh, data.completeAh, data.designedAh) == (10.0, 20.0, 20.0)
+    assert data.getData() is not None
+
+    # data received too long ago is not reported
+    data.parse(RESP_REALTIME, time.monotonic() - MAX_TIME_S - 1)
+    assert data.getData() is None
+
+
+def test_parse_invalid() -> None:
+    """Test that invalid frames do not update values."""
+
+    data = SupervoltData()
+    data.parse(bytearray(), time.monotonic())
+    data.parse(bytearray(b":0103~"), time.monotonic())
+    data.parse(bytearray(b":" + b"X" * 126 + b"~"), time.monotonic())
+    data.parse(bytearray(b":" + b"X" * 28 + b"~"), time.monotonic())
+
+    assert data.totalV is None
+    assert data.getData() is None
+
+
+def test_working_state() -> None:
+    """Test the textual representation of the working state."""
+
+    data = SupervoltData()
+    assert data.getWorkingStateText() == "Unbekannt"
+    assert data.getWorkingStateTextShort() == "nicht erreichbar"
+
+    for state, text, short in (
+        (0xF000, "DFET an | CFET an | DFET Schalter an | CFET Schalter an", "Normal"),
+        (0x0004, "Überladungsschutz", "Schutzschaltung"),
+        (0x0020, "Kurzschluss", "Kurzschluss"),
+        (0x0100, "Überhitzt (Laden)", "Überhitzt"),
+        (0x0800, "Unterkühlt (Entladen)", "Unterkühlt"),
+        (0x0003, "Laden | Entladen", "Unbekannt"),
+        (0x0000, "", "Unbekannt"),
+    ):
+        data.workingState = state
+        assert data.getWorkingStateText() == text
+        assert data.getWorkingStateTextShort() == short